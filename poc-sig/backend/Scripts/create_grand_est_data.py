@@ -9,6 +9,8 @@ import json
 import requests
 import random
 
+from reprojection import to_wgs84
+
 def fetch_piezometers():
     """Récupère les piézomètres depuis Hub'Eau"""
     features = []
@@ -18,39 +20,51 @@ def fetch_piezometers():
         try:
             url = f"https://hubeau.eaufrance.fr/api/v1/niveaux_nappes/stations?code_departement={dept}&size=50"
             response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-
-                for station in data.get('data', []):
-                    if station.get('geometry_x') and station.get('geometry_y'):
-                        feature = {
-                            "type": "Feature",
-                            "geometry": {
-                                "type": "Point",
-                                "coordinates": [
-                                    float(station['geometry_x']),
-                                    float(station['geometry_y'])
-                                ]
-                            },
-                            "properties": {
-                                "name": f"{station.get('nom_commune', 'Unknown')} - Piézomètre {station.get('code_bss', '')}",
-                                "type": "Piézomètre",
-                                "category": "nappe_phreatique",
-                                "layer": "Piézomètres",
-                                "commune": station.get('nom_commune', ''),
-                                "departement": station.get('nom_departement', 'Grand Est'),
-                                "code_bss": station.get('code_bss', ''),
-                                "altitude_sol": str(station.get('altitude_station', '')),
-                                "date_debut": station.get('date_debut_mesure', ''),
-                                "profondeur": float(station.get('profondeur_investigation', 10)),
-                                "color": "#4169E1",
-                                "validFrom": "2024-01-01T00:00:00Z",
-                                "validTo": None
-                            }
-                        }
-                        features.append(feature)
+            if response.status_code != 200:
+                continue
+            data = response.json()
         except Exception as e:
             print(f"Erreur pour le département {dept}: {e}")
+            continue
+
+        stations = [s for s in data.get('data', []) if s.get('geometry_x') and s.get('geometry_y')]
+        if not stations:
+            continue
+
+        # Reprojection vectorisée, CRS détecté via les métadonnées ou les plages de valeurs.
+        # Hors du try : un CRS non reconnu interrompt la génération au lieu d'omettre le département
+        lons, lats, crs = to_wgs84(
+            [float(s['geometry_x']) for s in stations],
+            [float(s['geometry_y']) for s in stations],
+            metadata=stations[0]
+        )
+        if crs != "EPSG:4326":
+            print(f"Département {dept} : coordonnées reprojetées depuis {crs}")
+
+        for station, lon, lat in zip(stations, lons, lats):
+            feature = {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [float(lon), float(lat)]
+                },
+                "properties": {
+                    "name": f"{station.get('nom_commune', 'Unknown')} - Piézomètre {station.get('code_bss', '')}",
+                    "type": "Piézomètre",
+                    "category": "nappe_phreatique",
+                    "layer": "Piézomètres",
+                    "commune": station.get('nom_commune', ''),
+                    "departement": station.get('nom_departement', 'Grand Est'),
+                    "code_bss": station.get('code_bss', ''),
+                    "altitude_sol": str(station.get('altitude_station', '')),
+                    "date_debut": station.get('date_debut_mesure', ''),
+                    "profondeur": float(station.get('profondeur_investigation', 10)),
+                    "color": "#4169E1",
+                    "validFrom": "2024-01-01T00:00:00Z",
+                    "validTo": None
+                }
+            }
+            features.append(feature)
 
     return features
 
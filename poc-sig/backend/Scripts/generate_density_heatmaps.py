@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Précalcul des cartes de densité pour les bas niveaux de zoom
+
+Pour chaque couche ponctuelle (piézomètres, stations qualité, stations
+hydrométriques) et chaque niveau de zoom, les points sont regroupés dans
+une grille alignée sur les pixels Web Mercator du Grand Est, lissés par
+une convolution gaussienne séparable, puis quantifiés sur 8 bits. Chaque
+grille est écrite en PNG RGBA (couleur de la couche, densité dans le canal
+alpha) directement superposable avec L.imageOverlay, et un manifest.json
+décrit les emprises et les facteurs d'échelle.
+
+Usage:
+    python generate_density_heatmaps.py [fichier.geojson] [--output heatmaps] [--zooms 5,6,7,8]
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Emprise du Grand Est (minLon, minLat, maxLon, maxLat)
+GRAND_EST_BBOX = (3.38, 47.42, 8.23, 50.17)
+
+TILE_SIZE = 256
+EARTH_CIRCUMFERENCE_M = 40075016.686
+
+DEFAULT_ZOOMS = [5, 6, 7, 8]
+
+# Au-delà, les points sont affichés individuellement ou en clusters : une carte de densité n'a plus de sens
+MAX_HEATMAP_ZOOM = 10
+
+# Longueur de noyau à partir de laquelle la convolution passe par FFT
+FFT_MIN_TAPS = 31
+
+# Largeur de bande du noyau, en mètres au sol
+DEFAULT_BANDWIDTH_M = 8000.0
+
+# Couches ponctuelles : catégories sources et couleur d'affichage
+LAYERS = {
+    "piezometres": {
+        "label": "Piézomètres",
+        "categories": {"nappe_phreatique"},
+        "color": "#4169E1",
+    },
+    "stations_qualite": {
+        "label": "Stations qualité eau",
+        "categories": {"surveillance", "qualite_eau"},
+        "color": "#00FF00",
+    },
+    "stations_hydrometrie": {
+        "label": "Stations hydrométriques",
+        "categories": {"mesure_debit"},
+        "color": "#0066CC",
+    },
+}
+
+
+def lonlat_to_pixels(lons, lats, zoom):
+    """Coordonnées pixel Web Mercator (origine nord-ouest) au zoom donné"""
+    world = TILE_SIZE * (1 << zoom)
+    lats = np.clip(lats, -85.05112878, 85.05112878)
+    px = (np.asarray(lons) + 180.0) / 360.0 * world
+    py = (1.0 - np.arcsinh(np.tan(np.radians(lats))) / np.pi) / 2.0 * world
+    return px, py
+
+
+def pixels_to_lonlat(px, py, zoom):
+    world = TILE_SIZE * (1 << zoom)
+    lon = px / world * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * py / world))))
+    return lon, lat
+
+
+def grid_extent(zoom, bbox=GRAND_EST_BBOX):
+    """Emprise de la grille alignée sur les pixels : (x0, y0, largeur, hauteur)"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    (x0, x1), (y1, y0) = lonlat_to_pixels(np.array([min_lon, max_lon]), np.array([min_lat, max_lat]), zoom)
+    x0, y0 = int(math.floor(x0)), int(math.floor(y0))
+    return x0, y0, int(math.ceil(x1)) - x0, int(math.ceil(y1)) - y0
+
+
+def bin_points(lons, lats, zoom, extent):
+    """Compte les points par pixel de la grille (un seul bincount)"""
+    x0, y0, width, height = extent
+    px, py = lonlat_to_pixels(lons, lats, zoom)
+    ix = np.floor(px - x0).astype(np.int64)
+    iy = np.floor(py - y0).astype(np.int64)
+    inside = (ix >= 0) & (ix < width) & (iy >= 0) & (iy < height)
+    counts = np.bincount(iy[inside] * width + ix[inside], minlength=width * height)
+    return counts.reshape(height, width).astype(np.float64)
+
+
+def gaussian_kernel(sigma):
+    """Noyau gaussien 1D normalisé, tronqué à 3 sigma"""
+    radius = max(int(math.ceil(3 * sigma)), 1)
+    offsets = np.arange(-radius, radius + 1, dtype=np.float64)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    return kernel / kernel.sum()
+
+
+def convolve_axis(grid, kernel, axis):
+    """
+    Convolution 1D le long d'un axe, bords à zéro.
+
+    Les noyaux courts sont appliqués par somme de décalages (vues sur le
+    tableau complété, sans copie) ; au-delà de FFT_MIN_TAPS coefficients,
+    la convolution passe par FFT pour que le coût ne dépende plus de sigma.
+    """
+    if len(kernel) > FFT_MIN_TAPS:
+        return _convolve_axis_fft(grid, kernel, axis)
+
+    radius = len(kernel) // 2
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (radius, radius)
+    padded = np.pad(grid, pad)
+    size = grid.shape[axis]
+
+    out = np.zeros_like(grid)
+    for offset, weight in enumerate(kernel):
+        window = padded[offset:offset + size, :] if axis == 0 else padded[:, offset:offset + size]
+        out += weight * window
+    return out
+
+
+def _convolve_axis_fft(grid, kernel, axis):
+    """Convolution linéaire (non circulaire) par FFT, recentrée sur la grille"""
+    size = grid.shape[axis]
+    radius = len(kernel) // 2
+    n = size + len(kernel) - 1
+    spectrum = np.fft.rfft(grid, n=n, axis=axis)
+    kernel_spectrum = np.fft.rfft(kernel, n=n)
+    shape = [1, 1]
+    shape[axis] = -1
+    full = np.fft.irfft(spectrum * kernel_spectrum.reshape(shape), n=n, axis=axis)
+    return full[radius:radius + size, :] if axis == 0 else full[:, radius:radius + size]
+
+
+def gaussian_blur(grid, sigma):
+    """Flou gaussien 2D séparable : lignes puis colonnes"""
+    kernel = gaussian_kernel(sigma)
+    return convolve_axis(convolve_axis(grid, kernel, 1), kernel, 0)
+
+
+def meters_per_pixel(zoom, lat):
+    return EARTH_CIRCUMFERENCE_M * math.cos(math.radians(lat)) / (TILE_SIZE * (1 << zoom))
+
+
+def quantize(density):
+    """Quantification 8 bits en racine carrée, pour garder visibles les zones peu denses"""
+    peak = float(density.max())
+    if peak <= 0:
+        return np.zeros(density.shape, dtype=np.uint8), 0.0
+    return np.round(np.sqrt(density / peak) * 255).astype(np.uint8), peak
+
+
+def write_png(path, rgba):
+    """Écrit un tableau (hauteur, largeur, 4) uint8 en PNG RGBA"""
+    height, width, _ = rgba.shape
+    raw = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 0] = 0  # filtre "None" pour chaque ligne
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 9)))
+        f.write(chunk(b"IEND", b""))
+
+
+def hex_to_rgb(color):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def load_layer_points(geojson_file):
+    """Regroupe les coordonnées des points par couche, selon la catégorie"""
+    with open(geojson_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    points = {key: ([], []) for key in LAYERS}
+    for feature in data.get("features", []):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") != "Point":
+            continue
+        category = (feature.get("properties") or {}).get("category")
+        for key, layer in LAYERS.items():
+            if category in layer["categories"]:
+                lon, lat = geometry["coordinates"][:2]
+                points[key][0].append(lon)
+                points[key][1].append(lat)
+
+    return {key: (np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+            for key, (lons, lats) in points.items()}
+
+
+def compute_density(lons, lats, zoom, bandwidth_m=DEFAULT_BANDWIDTH_M):
+    """Grille de densité (points/km²) au zoom donné, avec son emprise"""
+    extent = grid_extent(zoom)
+    counts = bin_points(lons, lats, zoom, extent)
+
+    center_lat = (GRAND_EST_BBOX[1] + GRAND_EST_BBOX[3]) / 2
+    pixel_m = meters_per_pixel(zoom, center_lat)
+    sigma = max(bandwidth_m / pixel_m, 0.5)
+    density = gaussian_blur(counts, sigma) / (pixel_m / 1000.0) ** 2
+    return density, extent, sigma
+
+
+def validate_zooms(zooms):
+    """Vérifie les niveaux de zoom demandés, lève ValueError sinon"""
+    if not zooms:
+        raise ValueError("Aucun niveau de zoom demandé")
+    invalid = [z for z in zooms if not 0 <= z <= MAX_HEATMAP_ZOOM]
+    if invalid:
+        raise ValueError(f"Niveaux de zoom hors de 0..{MAX_HEATMAP_ZOOM} : {invalid}")
+    return zooms
+
+
+def generate(geojson_file, output_dir, zooms, bandwidth_m=DEFAULT_BANDWIDTH_M):
+    validate_zooms(zooms)
+    os.makedirs(output_dir, exist_ok=True)
+    points = load_layer_points(geojson_file)
+
+    manifest = {
+        "source": os.path.basename(geojson_file),
+        "bandwidth_m": bandwidth_m,
+        "scale": "sqrt",
+        "layers": {},
+    }
+
+    for key, (lons, lats) in points.items():
+        layer = LAYERS[key]
+        if len(lons) == 0:
+            print(f"✗ {layer['label']} : aucun point")
+            continue
+
+        rgb = hex_to_rgb(layer["color"])
+        levels = []
+        for zoom in zooms:
+            density, (x0, y0, width, height), sigma = compute_density(lons, lats, zoom, bandwidth_m)
+            alpha, peak = quantize(density)
+
+            rgba = np.empty((height, width, 4), dtype=np.uint8)
+            rgba[..., :3] = rgb
+            rgba[..., 3] = alpha
+            filename = f"{key}_z{zoom}.png"
+            write_png(os.path.join(output_dir, filename), rgba)
+
+            west, north = pixels_to_lonlat(x0, y0, zoom)
+            east, south = pixels_to_lonlat(x0 + width, y0 + height, zoom)
+            levels.append({
+                "zoom": zoom,
+                "file": filename,
+                "width": width,
+                "height": height,
+                # Emprise au format Leaflet : [[sud, ouest], [nord, est]]
+                "bounds": [[south, west], [north, east]],
+                "sigma_px": round(sigma, 3),
+                # densité (points/km²) = (alpha / 255)² * max_density
+                "max_density": peak,
+            })
+            print(f"✓ {layer['label']} z{zoom} : {width}x{height} px, {len(lons)} points")
+
+        manifest["layers"][key] = {
+            "label": layer["label"],
+            "color": layer["color"],
+            "count": int(len(lons)),
+            "levels": levels,
+        }
+
+    manifest_file = os.path.join(output_dir, "manifest.json")
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Cartes de densité générées dans : {output_dir}")
+    return manifest
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Précalcule les cartes de densité par couche et niveau de zoom")
+    parser.add_argument("geojson", nargs="?", default=os.path.join(script_dir, "grand_est_eau_complet.geojson"))
+    parser.add_argument("--output", default=os.path.join(script_dir, "heatmaps"))
+    parser.add_argument("--zooms", default=",".join(str(z) for z in DEFAULT_ZOOMS),
+                        help=f"Niveaux de zoom séparés par des virgules (0 à {MAX_HEATMAP_ZOOM})")
+    parser.add_argument("--bandwidth", type=float, default=DEFAULT_BANDWIDTH_M,
+                        help="Largeur de bande du noyau gaussien, en mètres")
+    args = parser.parse_args()
+
+    try:
+        zooms = validate_zooms([int(z) for z in args.zooms.split(",") if z.strip()])
+    except ValueError as e:
+        parser.error(str(e))
+    generate(args.geojson, args.output, zooms, args.bandwidth)
+
+
+if __name__ == "__main__":
+    main()
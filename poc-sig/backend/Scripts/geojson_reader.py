@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture paresseuse des GeoJSON générés (grand_est_eau_complet.geojson...)
+
+Le fichier est projeté en mémoire (mmap) et un index des positions en
+octets de chaque entité est construit une seule fois, puis conservé à côté
+du fichier (<fichier>.idx.npz). Les exécutions suivantes rechargent
+l'index sans relire le GeoJSON : seules les entités consultées sont
+décodées.
+
+Exemple (noms de couches corrigés par fix_encoding.py ; voir reader.layers()):
+    with GeoJsonReader("grand_est_eau_complet.geojson") as reader:
+        feature = reader.get("BSS546577")
+        for feature in reader.features(layer="Piézomètres", bbox=(6.0, 48.5, 6.5, 49.0)):
+            ...
+"""
+
+import json
+import mmap
+import os
+import re
+import tempfile
+import zipfile
+
+import numpy as np
+
+INDEX_SUFFIX = ".idx.npz"
+INDEX_VERSION = 2
+
+# Jetons structurels : chaînes complètes (échappements compris) et délimiteurs
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.DOTALL)
+
+INDEX_KEYS = ("version", "source_size", "source_mtime_ns", "offsets", "lengths", "ids",
+              "sorted_ids", "id_order", "layer_names", "layer_codes", "bboxes")
+
+# Propriétés servant d'identifiant quand l'entité n'a pas d'"id"
+ID_PROPERTIES = ("id", "code_bss", "code_station")
+
+
+def feature_id(feature, position):
+    """
+    Identifiant d'une entité : "id" GeoJSON, puis code station, sinon sa
+    position préfixée ("#507"), pour ne pas entrer en collision avec un "id"
+    numérique.
+    """
+    if feature.get("id") is not None:
+        return str(feature["id"])
+    properties = feature.get("properties") or {}
+    for key in ID_PROPERTIES:
+        if properties.get(key):
+            return str(properties[key])
+    return f"#{position}"
+
+
+def geometry_bbox(geometry):
+    """Emprise (minX, minY, maxX, maxY) d'une géométrie, NaN si vide"""
+    xs, ys = [], []
+
+    def walk(coords):
+        if coords and isinstance(coords[0], (int, float)):
+            xs.append(coords[0])
+            ys.append(coords[1])
+        else:
+            for c in coords:
+                walk(c)
+
+    if geometry:
+        if geometry.get("type") == "GeometryCollection":
+            for part in geometry.get("geometries", []):
+                bbox = geometry_bbox(part)
+                if not np.isnan(bbox[0]):
+                    xs.extend((bbox[0], bbox[2]))
+                    ys.extend((bbox[1], bbox[3]))
+        else:
+            walk(geometry.get("coordinates") or [])
+
+    if not xs:
+        return (np.nan, np.nan, np.nan, np.nan)
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def scan_feature_spans(buffer):
+    """
+    Repère les entités du tableau "features" de premier niveau.
+
+    Retourne la liste des (début, fin) en octets de chaque objet entité,
+    sans décoder le JSON : seuls les délimiteurs et chaînes sont parcourus.
+    """
+    spans = []
+    depth = 0
+    in_features = False
+    features_key = False
+    start = None
+
+    for match in _TOKEN.finditer(buffer):
+        token = match.group()
+        first = token[:1]
+
+        if first == b'"':
+            # Clé "features" de l'objet racine
+            features_key = depth == 1 and token == b'"features"'
+            continue
+
+        if first in b"{[":
+            depth += 1
+            if depth == 2 and first == b"[" and features_key:
+                in_features = True
+            elif depth == 3 and in_features and first == b"{":
+                start = match.start()
+        else:
+            if depth == 3 and in_features and first == b"}":
+                spans.append((start, match.end()))
+            elif depth == 2 and in_features:
+                in_features = False
+            depth -= 1
+        features_key = False
+
+    return spans
+
+
+def build_index(path):
+    """Construit l'index des entités d'un GeoJSON et l'enregistre à côté du fichier"""
+    stat = os.stat(path)
+    offsets, lengths, ids, layers, bboxes = [], [], [], [], []
+
+    if stat.st_size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for position, (start, end) in enumerate(scan_feature_spans(buffer)):
+                feature = json.loads(buffer[start:end])
+                offsets.append(start)
+                lengths.append(end - start)
+                ids.append(feature_id(feature, position))
+                layers.append(str((feature.get("properties") or {}).get("layer") or ""))
+                bboxes.append(geometry_bbox(feature.get("geometry")))
+
+    layer_names = sorted(set(layers))
+    layer_codes = {name: code for code, name in enumerate(layer_names)}
+    ids = np.array(ids, dtype=np.str_)
+    # Tri stable : pour un identifiant en double, la première entité vient en tête
+    id_order = np.argsort(ids, kind="stable")
+
+    index = {
+        "version": np.array(INDEX_VERSION),
+        "source_size": np.array(stat.st_size, dtype=np.int64),
+        "source_mtime_ns": np.array(stat.st_mtime_ns, dtype=np.int64),
+        "offsets": np.array(offsets, dtype=np.int64),
+        "lengths": np.array(lengths, dtype=np.int64),
+        "ids": ids,
+        "sorted_ids": ids[id_order],
+        "id_order": id_order.astype(np.int64),
+        "layer_names": np.array(layer_names, dtype=np.str_),
+        "layer_codes": np.array([layer_codes[name] for name in layers], dtype=np.int32),
+        "bboxes": np.array(bboxes, dtype=np.float64).reshape(-1, 4),
+    }
+    save_index(path, index)
+    return index
+
+
+def save_index(path, index):
+    """
+    Enregistre l'index à côté du fichier via un fichier temporaire renommé,
+    pour qu'une écriture interrompue ou concurrente ne laisse jamais d'index
+    tronqué. Si le dossier n'est pas accessible en écriture, l'index reste
+    seulement en mémoire.
+    """
+    index_file = path + INDEX_SUFFIX
+    temp_file = None
+    try:
+        fd, temp_file = tempfile.mkstemp(prefix=os.path.basename(index_file) + ".",
+                                         suffix=".tmp", dir=os.path.dirname(os.path.abspath(index_file)))
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **index)
+        os.replace(temp_file, index_file)
+        return True
+    except OSError as e:
+        print(f"⚠ Index non enregistré ({e}), conservé en mémoire")
+        if temp_file and os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        return False
+
+
+def load_index(path):
+    """Charge l'index s'il correspond encore au fichier, sinon le reconstruit"""
+    index_file = path + INDEX_SUFFIX
+    stat = os.stat(path)
+    try:
+        with np.load(index_file) as data:
+            index = {key: data[key] for key in INDEX_KEYS}
+    except FileNotFoundError:
+        return build_index(path)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        # Index tronqué, corrompu ou d'un ancien format
+        print(f"⚠ Index {index_file} illisible ({e!r}), reconstruction")
+        return build_index(path)
+
+    if int(index["version"]) != INDEX_VERSION:
+        print(f"⚠ Index {index_file} en version {int(index['version'])}, reconstruction")
+    elif (int(index["source_size"]) != stat.st_size
+            or int(index["source_mtime_ns"]) != stat.st_mtime_ns):
+        print(f"⚠ Index {index_file} périmé (fichier source modifié), reconstruction")
+    else:
+        return index
+    return build_index(path)
+
+
+class GeoJsonReader:
+    """Accès aléatoire aux entités d'un GeoJSON projeté en mémoire"""
+
+    def __init__(self, path, rebuild_index=False):
+        self.path = path
+        self.index = build_index(path) if rebuild_index else load_index(path)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.index["offsets"])
+
+    def __getitem__(self, position):
+        return json.loads(self.raw(position))
+
+    def raw(self, position):
+        """Octets JSON bruts de l'entité à cette position"""
+        start = int(self.index["offsets"][position])
+        return self._buffer[start:start + int(self.index["lengths"][position])]
+
+    @property
+    def ids(self):
+        return self.index["ids"].tolist()
+
+    def position_of(self, fid):
+        """Position de l'entité d'identifiant donné (recherche dichotomique), None si absente"""
+        sorted_ids = self.index["sorted_ids"]
+        fid = str(fid)
+        i = int(np.searchsorted(sorted_ids, fid))
+        if i < len(sorted_ids) and sorted_ids[i] == fid:
+            return int(self.index["id_order"][i])
+        return None
+
+    def get(self, fid, default=None):
+        """Entité par identifiant (voir feature_id) ; en cas de doublon, la première"""
+        position = self.position_of(fid)
+        return default if position is None else self[position]
+
+    def layers(self):
+        """Nombre d'entités par couche"""
+        counts = np.bincount(self.index["layer_codes"], minlength=len(self.index["layer_names"]))
+        return dict(zip(self.index["layer_names"].tolist(), counts.tolist()))
+
+    def positions(self, layer=None, bbox=None):
+        """
+        Positions des entités filtrées par couche et/ou par emprise
+        (minX, minY, maxX, maxY), calculées sur l'index seul.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if layer is not None:
+            names = self.index["layer_names"].tolist()
+            if layer not in names:
+                return np.array([], dtype=np.int64)
+            mask &= self.index["layer_codes"] == names.index(layer)
+        if bbox is not None:
+            min_x, min_y, max_x, max_y = bbox
+            boxes = self.index["bboxes"]
+            # Les comparaisons avec NaN sont fausses : les géométries vides sont exclues
+            mask &= ((boxes[:, 0] <= max_x) & (boxes[:, 2] >= min_x)
+                     & (boxes[:, 1] <= max_y) & (boxes[:, 3] >= min_y))
+        return np.flatnonzero(mask)
+
+    def features(self, layer=None, bbox=None):
+        """Itère sur les entités filtrées ; seules celles-ci sont décodées"""
+        for position in self.positions(layer, bbox):
+            yield self[int(position)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Construit l'index d'un GeoJSON et affiche son contenu par couche")
+    parser.add_argument("geojson")
+    parser.add_argument("--rebuild", action="store_true", help="Force la reconstruction de l'index")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with GeoJsonReader(args.geojson, rebuild_index=args.rebuild) as reader:
+        elapsed = time.perf_counter() - start
+        print(f"✓ {len(reader)} entités indexées en {elapsed * 1000:.0f} ms ({args.geojson}{INDEX_SUFFIX})")
+        for name, count in reader.layers().items():
+            print(f"  {name or '(sans couche)'} : {count}")
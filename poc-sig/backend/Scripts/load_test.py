@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Harnais de tests de charge de l'API POC-SIG
+
+Génère des sessions cartographiques synthétiques sur le Grand Est
+(déplacements, zooms, découpage de la vue en tuiles, saisie dans
+l'autocomplétion, exports occasionnels), les rejoue contre le backend à
+concurrence fixée, puis affiche par endpoint les percentiles de latence,
+le débit et les taux d'erreur.
+
+Exemples:
+    python load_test.py --base-url http://localhost:5050 --sessions 50 --concurrency 16
+    python load_test.py --stand-in --sessions 20 --max-error-rate 0
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import ssl
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+# Emprise du Grand Est (minLon, minLat, maxLon, maxLat)
+GRAND_EST_BBOX = (3.38, 47.42, 8.23, 50.17)
+
+MIN_ZOOM = 7
+MAX_ZOOM = 16
+
+# Taille de la vue en pixels, telle qu'affichée par ClusteredMap.tsx sur un écran portable
+VIEWPORT_WIDTH = 1280
+VIEWPORT_HEIGHT = 800
+TILE_SIZE = 256
+
+# Niveau de zoom à partir duquel le frontend passe des clusters aux entités
+FEATURES_MIN_ZOOM = 12
+
+# Termes saisis par les utilisateurs, lettre par lettre
+SEARCH_TERMS = [
+    "Strasbourg", "Mulhouse", "Colmar", "Metz", "Nancy", "Reims",
+    "Charleville-Mézières", "Troyes", "Chaumont", "Épinal", "Verdun",
+    "Rhin", "Moselle", "Meuse", "Marne", "Lac de Gérardmer", "Piézomètre",
+]
+
+# Points de départ des sessions, centrés sur les principales villes
+SESSION_ANCHORS = [
+    (7.75, 48.58), (7.34, 47.75), (7.36, 48.08), (6.18, 49.12),
+    (6.18, 48.69), (4.03, 49.26), (4.72, 49.77), (4.08, 48.30),
+    (5.14, 48.11), (6.45, 48.17), (5.38, 49.16),
+]
+
+ENDPOINTS = ["cluster", "features", "autocomplete", "export_geojson", "export_csv"]
+
+
+# ---------------------------------------------------------------------------
+# Génération des sessions
+# ---------------------------------------------------------------------------
+
+def lon_to_tile_x(lon, zoom):
+    return (lon + 180.0) / 360.0 * (1 << zoom)
+
+
+def lat_to_tile_y(lat, zoom):
+    lat_rad = math.radians(lat)
+    return (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * (1 << zoom)
+
+
+def tile_x_to_lon(x, zoom):
+    return x / (1 << zoom) * 360.0 - 180.0
+
+
+def tile_y_to_lat(y, zoom):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << zoom)))))
+
+
+def viewport_bbox(center_lon, center_lat, zoom):
+    """Emprise (minLon, minLat, maxLon, maxLat) visible autour d'un centre au zoom donné"""
+    cx = lon_to_tile_x(center_lon, zoom)
+    cy = lat_to_tile_y(center_lat, zoom)
+    half_w = VIEWPORT_WIDTH / TILE_SIZE / 2
+    half_h = VIEWPORT_HEIGHT / TILE_SIZE / 2
+    return (
+        tile_x_to_lon(cx - half_w, zoom),
+        tile_y_to_lat(cy + half_h, zoom),
+        tile_x_to_lon(cx + half_w, zoom),
+        tile_y_to_lat(cy - half_h, zoom),
+    )
+
+
+def tile_bboxes(bbox, zoom):
+    """Découpe l'emprise de la vue en emprises des tuiles XYZ qui la couvrent"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    x0 = int(math.floor(lon_to_tile_x(min_lon, zoom)))
+    x1 = int(math.floor(lon_to_tile_x(max_lon, zoom)))
+    y0 = int(math.floor(lat_to_tile_y(max_lat, zoom)))
+    y1 = int(math.floor(lat_to_tile_y(min_lat, zoom)))
+
+    tiles = []
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            tiles.append((
+                tile_x_to_lon(x, zoom),
+                tile_y_to_lat(y + 1, zoom),
+                tile_x_to_lon(x + 1, zoom),
+                tile_y_to_lat(y, zoom),
+            ))
+    return tiles
+
+
+def format_bbox(bbox):
+    return ",".join(f"{v:.6f}" for v in bbox)
+
+
+def clamp_center(lon, lat):
+    min_lon, min_lat, max_lon, max_lat = GRAND_EST_BBOX
+    return min(max(lon, min_lon), max_lon), min(max(lat, min_lat), max_lat)
+
+
+def synthesize_session(rng, layers, steps):
+    """
+    Construit la liste ordonnée des requêtes (endpoint, chemin) d'un utilisateur.
+
+    Chaque étape déplace la carte, zoome, change de couche, saisit une
+    recherche ou exporte la vue. Après chaque changement de vue, les
+    clusters de la couche courante sont demandés ; à fort zoom, les entités
+    sont chargées tuile par tuile.
+    """
+    lon, lat = rng.choice(SESSION_ANCHORS)
+    lon, lat = clamp_center(lon + rng.uniform(-0.3, 0.3), lat + rng.uniform(-0.2, 0.2))
+    zoom = rng.randint(MIN_ZOOM, 9)
+    layer_id = rng.choice(layers)
+    requests = []
+
+    def view_requests():
+        bbox = viewport_bbox(lon, lat, zoom)
+        requests.append(("cluster", f"/api/cluster/{layer_id}?" + urlencode({
+            "zoom": zoom,
+            "bbox": format_bbox(bbox),
+            "clusterRadius": 50,
+        })))
+        if zoom >= FEATURES_MIN_ZOOM:
+            for tile in tile_bboxes(bbox, zoom):
+                requests.append(("features", f"/api/features/{layer_id}?" + urlencode({
+                    "bbox": format_bbox(tile),
+                    "page": 1,
+                    "pageSize": 100,
+                })))
+        return bbox
+
+    bbox = view_requests()
+    for _ in range(steps):
+        action = rng.choices(
+            ["pan", "zoom_in", "zoom_out", "search", "layer", "export"],
+            weights=[45, 20, 12, 12, 6, 5],
+        )[0]
+
+        if action == "pan":
+            # Déplacement d'au plus une demi-vue dans chaque direction
+            span_lon = bbox[2] - bbox[0]
+            span_lat = bbox[3] - bbox[1]
+            lon, lat = clamp_center(
+                lon + rng.uniform(-0.5, 0.5) * span_lon,
+                lat + rng.uniform(-0.5, 0.5) * span_lat,
+            )
+        elif action == "zoom_in":
+            zoom = min(zoom + rng.choice([1, 1, 2]), MAX_ZOOM)
+        elif action == "zoom_out":
+            zoom = max(zoom - rng.choice([1, 1, 2]), MIN_ZOOM)
+        elif action == "layer":
+            layer_id = rng.choice(layers)
+        elif action == "search":
+            term = rng.choice(SEARCH_TERMS)
+            # Saisie temporisée : toutes les frappes n'atteignent pas l'API
+            length = 2
+            while length <= len(term):
+                requests.append(("autocomplete", "/api/search/autocomplete?" + urlencode({
+                    "q": term[:length],
+                    "maxResults": 10,
+                })))
+                length += rng.randint(1, 3)
+            continue
+        elif action == "export":
+            kind = rng.choice(["geojson", "csv"])
+            requests.append((f"export_{kind}", f"/api/export/{layer_id}/{kind}?" + urlencode({
+                "bbox": format_bbox(bbox),
+            })))
+            continue
+
+        bbox = view_requests()
+
+    return requests
+
+
+def synthesize_sessions(count, layers, steps, seed):
+    rng = random.Random(seed)
+    return [synthesize_session(rng, layers, steps) for _ in range(count)]
+
+
+# ---------------------------------------------------------------------------
+# Rejeu
+# ---------------------------------------------------------------------------
+
+class ClientError(Exception):
+    """Échec côté client : connexion, délai dépassé ou protocole (pas de statut HTTP)"""
+
+
+class HttpConnection:
+    """
+    Connexion HTTP/1.1 keep-alive réutilisée par toutes les requêtes d'une session.
+
+    La connexion est (ré)ouverte à la demande : l'établissement est payé une
+    fois par session et non à chaque requête, et il est exclu des mesures
+    de latence.
+    """
+
+    def __init__(self, base, timeout):
+        self.base = base
+        self.timeout = timeout
+        self.ssl_context = ssl.create_default_context() if base.scheme == "https" else None
+        self.port = base.port or (443 if self.ssl_context else 80)
+        self.reader = None
+        self.writer = None
+        self.connects = 0
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        if self.connected:
+            return
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.base.hostname, self.port, ssl=self.ssl_context), self.timeout)
+        except (OSError, asyncio.TimeoutError, ssl.SSLError) as e:
+            raise ClientError(f"connect: {e!r}") from e
+        self.connects += 1
+
+    async def close(self):
+        if self.writer is None:
+            return
+        writer, self.reader, self.writer = self.writer, None, None
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+    async def get(self, path):
+        """Envoie une requête GET sur la connexion ouverte, retourne (statut, taille du corps)"""
+        try:
+            return await asyncio.wait_for(self._get(path), self.timeout)
+        except ClientError:
+            await self.close()
+            raise
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ssl.SSLError, ValueError) as e:
+            await self.close()
+            raise ClientError(f"request: {e!r}") from e
+
+    async def _get(self, path):
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {self.base.netloc}\r\n"
+            "Accept: application/json\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        self.writer.write(request.encode("utf-8"))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        parts = status_line.decode("latin-1").split(" ", 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise ClientError(f"ligne de statut invalide : {status_line!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ClientError("connexion fermée pendant les en-têtes")
+            if line in (b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if status in (204, 304) or 100 <= status < 200:
+            size = 0
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            size = await self._read_chunked()
+        elif "content-length" in headers:
+            size = int(headers["content-length"])
+            await self.reader.readexactly(size)
+        else:
+            # Sans délimitation : le corps s'arrête à la fermeture de la connexion par le serveur
+            size = len(await self.reader.read())
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, size
+
+    async def _read_chunked(self):
+        size = 0
+        while True:
+            line = await self.reader.readline()
+            chunk_size = int(line.split(b";", 1)[0].strip(), 16)
+            if chunk_size == 0:
+                # Ignore les en-têtes de fin jusqu'à la ligne vide finale
+                while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return size
+            await self.reader.readexactly(chunk_size + 2)
+            size += chunk_size
+
+
+class Stats:
+    """
+    Latences et échecs par endpoint.
+
+    Les erreurs HTTP (réponses 4xx/5xx) et les erreurs client (connexion,
+    délai dépassé, protocole) sont comptées séparément : seules les
+    premières indiquent une défaillance de l'endpoint lui-même. Les
+    latences ne sont mesurées que pour les requêtes ayant reçu une réponse.
+    """
+
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.http_errors = {name: 0 for name in ENDPOINTS}
+        self.client_errors = {name: 0 for name in ENDPOINTS}
+        self.connects = 0
+        self.bytes = 0
+        self.started = None
+        self.finished = None
+
+    def record(self, endpoint, latency, status, size=0):
+        self.latencies[endpoint].append(latency)
+        if status >= 400:
+            self.http_errors[endpoint] += 1
+        self.bytes += size
+
+    def record_client_error(self, endpoint):
+        self.client_errors[endpoint] += 1
+
+
+async def replay_session(session, base, stats, semaphore, timeout, think_time, rng):
+    connection = HttpConnection(base, timeout)
+    try:
+        for endpoint, path in session:
+            async with semaphore:
+                try:
+                    await connection.connect()
+                    start = time.perf_counter()
+                    status, size = await connection.get(path)
+                    stats.record(endpoint, time.perf_counter() - start, status, size)
+                except ClientError:
+                    stats.record_client_error(endpoint)
+            if think_time > 0:
+                await asyncio.sleep(rng.uniform(0, think_time))
+    finally:
+        stats.connects += connection.connects
+        await connection.close()
+
+
+async def replay(sessions, base_url, concurrency, timeout=30.0, think_time=0.0, seed=None):
+    """Rejoue toutes les sessions en parallèle, au plus `concurrency` requêtes en cours"""
+    base = urlsplit(base_url)
+    stats = Stats()
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(seed)
+
+    stats.started = time.perf_counter()
+    await asyncio.gather(*(
+        replay_session(session, base, stats, semaphore, timeout, think_time, rng)
+        for session in sessions
+    ))
+    stats.finished = time.perf_counter()
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Rapport
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Percentile au rang le plus proche d'une liste déjà triée"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(math.ceil(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(stats):
+    elapsed = max(stats.finished - stats.started, 1e-9)
+    summary = {"endpoints": {}}
+    totals = {"requests": 0, "http_errors": 0, "client_errors": 0}
+
+    for endpoint in ENDPOINTS:
+        values = sorted(stats.latencies[endpoint])
+        http_errors = stats.http_errors[endpoint]
+        client_errors = stats.client_errors[endpoint]
+        count = len(values) + client_errors
+        if not count:
+            continue
+        totals["requests"] += count
+        totals["http_errors"] += http_errors
+        totals["client_errors"] += client_errors
+        summary["endpoints"][endpoint] = {
+            "requests": count,
+            "http_errors": http_errors,
+            "client_errors": client_errors,
+            "errors": http_errors + client_errors,
+            "http_error_rate": http_errors / count,
+            "client_error_rate": client_errors / count,
+            "error_rate": (http_errors + client_errors) / count,
+            "rps": count / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p90_ms": percentile(values, 90) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": values[-1] * 1000 if values else 0.0,
+        }
+
+    total = totals["requests"]
+    summary.update(totals)
+    summary["errors"] = totals["http_errors"] + totals["client_errors"]
+    summary["http_error_rate"] = totals["http_errors"] / total if total else 0.0
+    summary["client_error_rate"] = totals["client_errors"] / total if total else 0.0
+    summary["error_rate"] = summary["errors"] / total if total else 0.0
+    summary["rps"] = total / elapsed
+    summary["duration_s"] = elapsed
+    summary["connections"] = stats.connects
+    summary["bytes"] = stats.bytes
+    return summary
+
+
+def print_summary(summary):
+    header = (f"{'endpoint':<16}{'requêtes':>9}{'http%':>8}{'client%':>9}{'req/s':>9}"
+              f"{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    print(header)
+    print("-" * len(header))
+    for endpoint, s in summary["endpoints"].items():
+        print(
+            f"{endpoint:<16}{s['requests']:>9}{s['http_error_rate'] * 100:>7.2f}%"
+            f"{s['client_error_rate'] * 100:>8.2f}%{s['rps']:>9.1f}"
+            f"{s['p50_ms']:>9.1f}{s['p90_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}"
+        )
+    print("-" * len(header))
+    print(
+        f"Total : {summary['requests']} requêtes en {summary['duration_s']:.2f} s "
+        f"({summary['rps']:.1f} req/s) sur {summary['connections']} connexions, "
+        f"{summary['http_errors']} erreurs HTTP ({summary['http_error_rate'] * 100:.2f} %), "
+        f"{summary['client_errors']} erreurs client ({summary['client_error_rate'] * 100:.2f} %), "
+        f"{summary['bytes'] / 1024:.0f} Kio reçus"
+    )
+    print("Latences en ms, établissement des connexions exclu")
+
+
+# ---------------------------------------------------------------------------
+# Serveur de substitution
+# ---------------------------------------------------------------------------
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Imitation minimale des routes de l'API, avec des réponses prédéfinies"""
+
+    protocol_version = "HTTP/1.1"
+    # En-têtes et corps sont écrits séparément : avec Nagle, les réponses keep-alive attendent les ACK différés
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts[:2] == ["api", "search"] and parts[2:] == ["autocomplete"]:
+            q = query.get("q", [""])[0]
+            if len(q.strip()) < 2:
+                return self.send_json(400, {"isSuccess": False, "errors": ["Query must be at least 2 characters"]})
+            return self.send_json(200, {"isSuccess": True, "value": [
+                {"id": i, "name": f"{q} {i}", "type": "Commune"} for i in range(3)
+            ]})
+
+        if len(parts) >= 3 and parts[0] == "api" and parts[2].isdigit():
+            if parts[1] == "cluster" and len(parts) == 3:
+                return self.send_json(200, {"type": "FeatureCollection", "features": []})
+            if parts[1] == "features" and len(parts) == 3:
+                return self.send_json(200, {"data": [], "page": 1, "pageSize": 100, "totalCount": 0})
+            if parts[1] == "export" and parts[3:] == ["geojson"]:
+                return self.send_json(200, {"type": "FeatureCollection", "features": []})
+            if parts[1] == "export" and parts[3:] == ["csv"]:
+                return self.send_chunked(200, [b"Id,Name,Geometry\n", b"1,Station,POINT(6 48)\n"], "text/csv")
+
+        # Statut forcé, pour vérifier le comptage des échecs
+        if parts[:2] == ["api", "stand-in-status"] and len(parts) == 3 and parts[2].isdigit():
+            return self.send_json(int(parts[2]), {"error": "Forced status"})
+
+        self.send_json(404, {"error": "Not found"})
+
+    def send_json(self, status, payload):
+        self.send_body(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunked(self, status, chunks, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # La file d'attente par défaut (5) bloque les connexions sous concurrence
+    request_queue_size = 128
+
+
+def start_stand_in_server(latency_ms=0.0):
+    """Démarre le serveur de substitution sur un port local libre, retourne (serveur, URL de base)"""
+    handler = type("StandInHandler", (StandInHandler,), {"latency": latency_ms / 1000.0})
+    server = StandInServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rejoue des sessions cartographiques synthétiques contre l'API POC-SIG")
+    parser.add_argument("--base-url", default="http://localhost:5050", help="URL de base de l'API")
+    parser.add_argument("--stand-in", action="store_true", help="Utilise un serveur local de substitution au lieu de l'API")
+    parser.add_argument("--stand-in-latency-ms", type=float, default=0.0, help="Latence artificielle du serveur de substitution, en ms")
+    parser.add_argument("--sessions", type=int, default=20, help="Nombre de sessions utilisateur à générer")
+    parser.add_argument("--steps", type=int, default=30, help="Interactions par session")
+    parser.add_argument("--concurrency", type=int, default=8, help="Nombre maximal de requêtes simultanées")
+    parser.add_argument("--layers", default="1", help="Identifiants des couches parcourues, séparés par des virgules")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pause maximale entre deux requêtes d'une session, en secondes")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Délai maximal par requête, en secondes")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire de génération des sessions")
+    parser.add_argument("--json", dest="json_output", help="Écrit aussi le résumé dans ce fichier JSON")
+    parser.add_argument("--max-error-rate", type=float, default=None,
+                        help="Code de sortie 1 si le taux d'erreur global dépasse cette fraction")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    layers = [int(layer) for layer in args.layers.split(",") if layer.strip()]
+
+    server = None
+    base_url = args.base_url
+    if args.stand_in:
+        server, base_url = start_stand_in_server(args.stand_in_latency_ms)
+        print(f"Serveur de substitution en écoute sur {base_url}")
+
+    sessions = synthesize_sessions(args.sessions, layers, args.steps, args.seed)
+    total = sum(len(s) for s in sessions)
+    print(f"Rejeu de {len(sessions)} sessions ({total} requêtes) contre {base_url}, "
+          f"concurrence {args.concurrency}...")
+
+    try:
+        stats = asyncio.run(replay(sessions, base_url, args.concurrency, args.timeout, args.think_time, args.seed))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    summary = summarize(stats)
+    print_summary(summary)
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"✓ Résumé enregistré dans : {args.json_output}")
+
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        print(f"✗ Taux d'erreur de {summary['error_rate']:.2%} supérieur à {args.max_error_rate:.2%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Détection du système de coordonnées et reprojection vectorisée vers WGS84
+
+Gère le Lambert-93 (EPSG:2154), les coniques conformes RGF93 CC42 à CC50
+(EPSG:3942 à 3950) et le WGS84 (EPSG:4326 / CRS84). RGF93 et WGS84 sont
+confondus à l'échelle métrique : seule la projection est inversée, sans
+changement de datum. Les tableaux complets sont convertis en un seul appel
+NumPy, sans boucle Python par point.
+"""
+
+import re
+
+import numpy as np
+
+WGS84 = "EPSG:4326"
+LAMBERT_93 = "EPSG:2154"
+
+# Ellipsoïde GRS80 (RGF93)
+GRS80_A = 6378137.0
+GRS80_F = 1 / 298.257222101
+GRS80_E = np.sqrt(2 * GRS80_F - GRS80_F ** 2)
+
+# Projections coniques conformes : (lat0, lat1, lat2, lon0, x0, y0) en degrés et mètres
+LCC_PARAMETERS = {
+    LAMBERT_93: (46.5, 44.0, 49.0, 3.0, 700000.0, 6600000.0),
+}
+for _zone in range(42, 51):
+    LCC_PARAMETERS[f"EPSG:{3900 + _zone}"] = (
+        float(_zone), _zone - 0.75, _zone + 0.75, 3.0, 1700000.0, (_zone - 41) * 1000000.0 + 200000.0
+    )
+
+# Coefficients de la série latitude conforme -> latitude géodésique (Snyder, 3-5)
+_E2 = GRS80_E ** 2
+_CONFORMAL_A2 = _E2 / 2 + 5 * _E2 ** 2 / 24 + _E2 ** 3 / 12 + 13 * _E2 ** 4 / 360
+_CONFORMAL_A4 = 7 * _E2 ** 2 / 48 + 29 * _E2 ** 3 / 240 + 811 * _E2 ** 4 / 11520
+_CONFORMAL_A6 = 7 * _E2 ** 3 / 120 + 81 * _E2 ** 4 / 1120
+_CONFORMAL_A8 = 4279 * _E2 ** 4 / 161280
+
+SUPPORTED_CRS = [WGS84] + list(LCC_PARAMETERS)
+
+# Nombre de points examinés pour détecter le CRS d'après les valeurs
+DETECTION_SAMPLE_SIZE = 10000
+
+# Écart maximal en y entre les coordonnées et l'origine d'une zone CC
+# (zone nominale de ±0,75° de latitude, soit environ ±85 km, plus une marge)
+CC_ZONE_HALF_HEIGHT_M = 150000.0
+
+# Codes Sandre de projection (champ code_projection de Hub'Eau) vers EPSG
+SANDRE_PROJECTIONS = {
+    "26": LAMBERT_93,
+    "31": WGS84,
+}
+
+# Identifiants reconnus dans les métadonnées (GeoJSON "crs", champs srid des API)
+_WGS84_ALIASES = {"4326", "CRS84", "WGS84", "WGS 84"}
+
+
+def normalize_crs(value):
+    """
+    Convertit un identifiant de CRS (2154, "EPSG:2154",
+    "urn:ogc:def:crs:EPSG::2154", "urn:ogc:def:crs:OGC:1.3:CRS84"...)
+    en code "EPSG:xxxx". Retourne None si le CRS n'est pas reconnu.
+    """
+    if value is None:
+        return None
+    text = str(value).strip().upper()
+    if not text:
+        return None
+
+    last = re.split(r"[:/]", text)[-1]
+    if last in _WGS84_ALIASES or text in _WGS84_ALIASES:
+        return WGS84
+    if last.isdigit():
+        code = f"EPSG:{int(last)}"
+        if code in SUPPORTED_CRS:
+            return code
+    return None
+
+
+def crs_from_metadata(record, geometry=False):
+    """
+    Lit le CRS déclaré dans un enregistrement source (GeoJSON ou Hub'Eau).
+
+    Le "crs" d'une géométrie GeoJSON ne décrit que `geometry.coordinates` :
+    il n'est lu que si `geometry` est vrai, jamais pour des champs plats
+    (x/y, geometry_x/geometry_y).
+    """
+    if not isinstance(record, dict):
+        return None
+
+    if geometry and isinstance(record.get("geometry"), dict):
+        crs = record["geometry"].get("crs") or {}
+        name = normalize_crs((crs.get("properties") or {}).get("name"))
+        if name:
+            return name
+
+    crs = record.get("crs")
+    if isinstance(crs, dict):
+        crs = (crs.get("properties") or {}).get("name")
+    for candidate in (crs, record.get("srid")):
+        if normalize_crs(candidate):
+            return normalize_crs(candidate)
+
+    # code_projection contient un code Sandre, pas un code EPSG
+    sandre = str(record.get("code_projection") or "").strip()
+    return SANDRE_PROJECTIONS.get(sandre)
+
+
+def _values_match(crs, x, y):
+    """Les coordonnées médianes sont-elles plausibles dans ce CRS ?"""
+    if crs == WGS84:
+        return -180.0 <= x <= 180.0 and -90.0 <= y <= 90.0
+    if crs == LAMBERT_93:
+        return 0.0 <= x < 1300000.0 and 6000000.0 <= y <= 7200000.0
+    y0 = LCC_PARAMETERS[crs][5]
+    return 1000000.0 <= x <= 2400000.0 and abs(y - y0) <= CC_ZONE_HALF_HEIGHT_M
+
+
+def _crs_from_values(x, y):
+    """
+    CRS déduit de coordonnées médianes, None si aucun ne correspond.
+
+    Les plages du Lambert-93 et des zones CC se recouvrent pour x entre
+    1 000 et 1 300 km : l'est du Lambert-93 (Provence, Corse) peut
+    ressembler à l'ouest de CC47 (à l'ouest de 1°W environ). Les deux
+    candidats sont testés et une ambiguïté lève ValueError : le CRS doit
+    alors être déclaré dans les métadonnées.
+    """
+    if _values_match(WGS84, x, y):
+        return WGS84
+
+    candidates = [LAMBERT_93] if _values_match(LAMBERT_93, x, y) else []
+    zone = int(round((y - 200000.0) / 1000000.0)) + 41
+    if 42 <= zone <= 50 and _values_match(f"EPSG:{3900 + zone}", x, y):
+        candidates.append(f"EPSG:{3900 + zone}")
+
+    if len(candidates) > 1:
+        raise ValueError(f"Coordonnées médianes ({x}, {y}) ambiguës entre {' et '.join(candidates)}, "
+                         f"CRS à déclarer dans les métadonnées")
+    return candidates[0] if candidates else None
+
+
+def detect_crs(xs, ys, metadata=None):
+    """
+    Détermine le CRS d'un lot de coordonnées.
+
+    Le CRS déclaré dans les métadonnées est retenu s'il est cohérent avec
+    les valeurs ; sinon (ou en l'absence de métadonnées) le CRS est déduit
+    des plages de valeurs (médiane, robuste aux quelques points aberrants).
+    Lève ValueError si les valeurs ne correspondent à aucun CRS supporté.
+    """
+    declared = normalize_crs(metadata) if not isinstance(metadata, dict) else crs_from_metadata(metadata)
+
+    # Un échantillon régulier suffit à situer les plages de valeurs
+    xs = np.asarray(xs, dtype=np.float64).ravel()
+    ys = np.asarray(ys, dtype=np.float64).ravel()
+    step = max(xs.size // DETECTION_SAMPLE_SIZE, 1)
+    xs, ys = xs[::step], ys[::step]
+    valid = np.isfinite(xs) & np.isfinite(ys)
+    if not valid.any():
+        if declared:
+            return declared
+        raise ValueError("Aucune coordonnée valide pour détecter le CRS")
+
+    x = float(np.median(xs[valid]))
+    y = float(np.median(ys[valid]))
+
+    if declared and _values_match(declared, x, y):
+        return declared
+
+    detected = _crs_from_values(x, y)
+    if detected is None:
+        raise ValueError(f"CRS non reconnu pour les coordonnées médianes ({x}, {y})")
+    if declared:
+        print(f"⚠ CRS déclaré {declared} incohérent avec les coordonnées ({x:.2f}, {y:.2f}), "
+              f"{detected} retenu d'après les valeurs")
+    return detected
+
+
+def _lcc_constants(crs):
+    lat0, lat1, lat2, lon0, x0, y0 = LCC_PARAMETERS[crs]
+    e = GRS80_E
+
+    def m(phi):
+        return np.cos(phi) / np.sqrt(1 - (e * np.sin(phi)) ** 2)
+
+    def t(phi):
+        return np.tan(np.pi / 4 - phi / 2) / ((1 - e * np.sin(phi)) / (1 + e * np.sin(phi))) ** (e / 2)
+
+    phi0, phi1, phi2 = np.radians([lat0, lat1, lat2])
+    n = (np.log(m(phi1)) - np.log(m(phi2))) / (np.log(t(phi1)) - np.log(t(phi2)))
+    big_f = m(phi1) / (n * t(phi1) ** n)
+    rho0 = GRS80_A * big_f * t(phi0) ** n
+    return n, big_f, rho0, np.radians(lon0), x0, y0
+
+
+def lcc_to_wgs84(xs, ys, crs):
+    """Inverse d'une projection conique conforme RGF93 vers (lon, lat) en degrés"""
+    n, big_f, rho0, lon0, x0, y0 = _lcc_constants(crs)
+
+    dx = np.asarray(xs, dtype=np.float64) - x0
+    dy = rho0 - (np.asarray(ys, dtype=np.float64) - y0)
+    rho = np.sign(n) * np.hypot(dx, dy)
+    t = (rho / (GRS80_A * big_f)) ** (1 / n)
+    theta = np.arctan2(dx, dy)
+
+    # Latitude conforme puis latitude géodésique par la série de Snyder (3-5),
+    # exacte à 1e-12 rad sans itération
+    chi = np.pi / 2 - 2 * np.arctan(t)
+    s2 = np.sin(2 * chi)
+    c2 = np.cos(2 * chi)
+    s4 = 2 * s2 * c2
+    c4 = 1 - 2 * s2 * s2
+    s6 = s4 * c2 + c4 * s2
+    s8 = 2 * s4 * c4
+    phi = chi + _CONFORMAL_A2 * s2 + _CONFORMAL_A4 * s4 + _CONFORMAL_A6 * s6 + _CONFORMAL_A8 * s8
+
+    return np.degrees(theta / n + lon0), np.degrees(phi)
+
+
+def wgs84_to_lcc(lons, lats, crs):
+    """Projection de (lon, lat) en degrés vers une conique conforme RGF93"""
+    n, big_f, rho0, lon0, x0, y0 = _lcc_constants(crs)
+    e = GRS80_E
+
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    es = e * np.sin(phi)
+    t = np.tan(np.pi / 4 - phi / 2) / ((1 - es) / (1 + es)) ** (e / 2)
+    rho = GRS80_A * big_f * t ** n
+    theta = n * (np.radians(np.asarray(lons, dtype=np.float64)) - lon0)
+
+    return x0 + rho * np.sin(theta), y0 + rho0 - rho * np.cos(theta)
+
+
+def to_wgs84(xs, ys, crs=None, metadata=None):
+    """
+    Convertit des tableaux de coordonnées vers WGS84 en un seul appel.
+
+    Si `crs` n'est pas fourni, il est détecté via `detect_crs`. Retourne
+    (lons, lats, crs source) ; les tableaux en WGS84 sont renvoyés tels quels.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    source = normalize_crs(crs) if crs is not None else detect_crs(xs, ys, metadata)
+    if source is None:
+        raise ValueError(f"CRS non supporté : {crs}")
+
+    if source == WGS84:
+        return xs, ys, source
+    lons, lats = lcc_to_wgs84(xs, ys, source)
+    return lons, lats, source
+
+
+if __name__ == "__main__":
+    import time
+
+    # Vérification aller-retour et mesure sur un million de points du Grand Est
+    rng = np.random.default_rng(0)
+    lons = rng.uniform(3.38, 8.23, 1000000)
+    lats = rng.uniform(47.42, 50.17, 1000000)
+
+    for code in [LAMBERT_93, "EPSG:3949"]:
+        x, y = wgs84_to_lcc(lons, lats, code)
+        start = time.perf_counter()
+        back_lons, back_lats, detected = to_wgs84(x, y)
+        elapsed = time.perf_counter() - start
+        error = max(np.abs(back_lons - lons).max(), np.abs(back_lats - lats).max())
+        print(f"{code} -> détecté {detected}, erreur max {error:.2e}°, {elapsed * 1000:.0f} ms pour 1M points")
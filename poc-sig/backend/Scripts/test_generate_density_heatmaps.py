@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Tests du précalcul des cartes de densité (python -m pytest test_generate_density_heatmaps.py)"""
+
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import generate_density_heatmaps as heatmaps
+from generate_density_heatmaps import (
+    bin_points, convolve_axis, gaussian_blur, gaussian_kernel, generate, grid_extent,
+    lonlat_to_pixels, pixels_to_lonlat, quantize, validate_zooms, write_png,
+)
+
+ZOOM = 7
+
+
+def read_png(path):
+    """Décode un PNG RGBA 8 bits non filtré écrit par write_png"""
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+
+    chunks, pos = {}, 8
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos:pos + 4])
+        tag = data[pos + 4:pos + 8]
+        body = data[pos + 8:pos + 8 + length]
+        (crc,) = struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(tag + body) & 0xFFFFFFFF
+        chunks[tag] = body
+        pos += 12 + length
+
+    width, height, depth, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    assert (depth, color_type) == (8, 6)
+    raw = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert (raw[:, 0] == 0).all()
+    return raw[:, 1:].reshape(height, width, 4)
+
+
+@pytest.mark.parametrize("sigma", [0.5, 2.0, 12.0])
+def test_gaussian_kernel_sums_to_one(sigma):
+    kernel = gaussian_kernel(sigma)
+    assert kernel.sum() == pytest.approx(1.0)
+    assert len(kernel) % 2 == 1
+    np.testing.assert_allclose(kernel, kernel[::-1])
+
+
+def test_bin_points_known_pixel_and_outside_dropped():
+    extent = grid_extent(ZOOM)
+    x0, y0, width, height = extent
+    px, py = lonlat_to_pixels(np.array([6.18]), np.array([48.69]), ZOOM)
+
+    counts = bin_points(np.array([6.18, 6.18, 2.35, 6.18]), np.array([48.69, 48.69, 48.86, 45.0]), ZOOM, extent)
+    assert counts.shape == (height, width)
+    # Paris et Lyon sont hors de l'emprise : seuls les deux points de Nancy restent
+    assert counts.sum() == 2
+    assert counts[int(py[0]) - y0, int(px[0]) - x0] == 2
+
+
+@pytest.mark.parametrize("sigma", [1.5, 12.0])
+def test_blur_preserves_total_away_from_edges(sigma):
+    grid = np.zeros((200, 240))
+    grid[90, 100] = 3
+    grid[120, 130] = 1
+    blurred = gaussian_blur(grid, sigma)
+    assert blurred.sum() == pytest.approx(4.0)
+    assert blurred.min() >= -1e-12
+
+
+@pytest.mark.parametrize("sigma", [2.0, 20.0])
+def test_convolve_axis_matches_numpy(sigma):
+    # Le chemin par décalages et le chemin FFT donnent la convolution "same" de NumPy
+    grid = np.random.default_rng(0).random((150, 180))
+    kernel = gaussian_kernel(sigma)
+    for axis in (0, 1):
+        expected = np.apply_along_axis(lambda v: np.convolve(v, kernel, mode="same"), axis, grid)
+        np.testing.assert_allclose(convolve_axis(grid, kernel, axis), expected, atol=1e-12)
+
+
+def test_quantize_empty_grid():
+    alpha, peak = quantize(np.zeros((3, 4)))
+    assert peak == 0.0
+    assert alpha.dtype == np.uint8
+    assert not alpha.any()
+
+
+def test_quantize_sqrt_scale():
+    alpha, peak = quantize(np.array([[0.0, 1.0, 4.0]]))
+    assert peak == 4.0
+    assert alpha.tolist() == [[0, 128, 255]]
+
+
+def test_write_png_round_trip(tmp_path):
+    rgba = np.zeros((3, 5, 4), dtype=np.uint8)
+    rgba[..., :3] = (65, 105, 225)
+    rgba[..., 3] = np.arange(15, dtype=np.uint8).reshape(3, 5) * 10
+    path = tmp_path / "carte.png"
+    write_png(str(path), rgba)
+
+    decoded = read_png(path)
+    assert decoded.shape == (3, 5, 4)
+    np.testing.assert_array_equal(decoded, rgba)
+
+
+def test_validate_zooms():
+    assert validate_zooms([5, 8]) == [5, 8]
+    with pytest.raises(ValueError):
+        validate_zooms([])
+    with pytest.raises(ValueError):
+        validate_zooms([heatmaps.MAX_HEATMAP_ZOOM + 1])
+
+
+@pytest.fixture
+def geojson_file(tmp_path):
+    def point(lon, lat, category):
+        return {"type": "Feature", "properties": {"category": category},
+                "geometry": {"type": "Point", "coordinates": [lon, lat]}}
+
+    features = [
+        point(6.18, 48.69, "nappe_phreatique"),
+        point(7.75, 48.58, "nappe_phreatique"),
+        point(4.03, 49.26, "surveillance"),
+        point(5.00, 48.00, "qualite_eau"),
+        # Catégorie sans couche et géométrie non ponctuelle : ignorées
+        point(6.00, 48.00, "autre"),
+        {"type": "Feature", "properties": {"category": "mesure_debit"},
+         "geometry": {"type": "LineString", "coordinates": [[6.0, 48.0], [6.1, 48.1]]}},
+    ]
+    path = tmp_path / "points.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}), encoding="utf-8")
+    return str(path)
+
+
+def test_generate_writes_levels_and_manifest(geojson_file, tmp_path):
+    output_dir = tmp_path / "heatmaps"
+    zooms = [5, 6]
+    manifest = generate(geojson_file, str(output_dir), zooms)
+
+    assert set(manifest["layers"]) == {"piezometres", "stations_qualite"}
+    assert sorted(os.listdir(output_dir)) == sorted(
+        ["manifest.json"] + [f"{key}_z{zoom}.png" for key in manifest["layers"] for zoom in zooms]
+    )
+    with open(output_dir / "manifest.json", encoding="utf-8") as f:
+        assert json.load(f) == manifest
+
+    piezometres = manifest["layers"]["piezometres"]
+    assert piezometres["count"] == 2
+    for level in piezometres["levels"]:
+        zoom = level["zoom"]
+        x0, y0, width, height = grid_extent(zoom)
+        west, north = pixels_to_lonlat(x0, y0, zoom)
+        east, south = pixels_to_lonlat(x0 + width, y0 + height, zoom)
+        assert level["bounds"] == [[south, west], [north, east]]
+        assert south <= heatmaps.GRAND_EST_BBOX[1] and north >= heatmaps.GRAND_EST_BBOX[3]
+
+        image = read_png(output_dir / level["file"])
+        assert image.shape == (height, width, 4)
+        assert (image[..., :3] == (0x41, 0x69, 0xE1)).all()
+        assert image[..., 3].max() == 255
+        assert level["max_density"] > 0
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Tests du lecteur paresseux de GeoJSON (python -m pytest test_geojson_reader.py)"""
+
+import json
+import os
+
+import pytest
+
+import geojson_reader
+from geojson_reader import INDEX_SUFFIX, GeoJsonReader
+
+FEATURES = [
+    {"type": "Feature", "id": 1,
+     "properties": {"name": "x\"}]{[", "layer": "Piézomètres"},
+     "geometry": {"type": "Point", "coordinates": [6.2, 48.9]}},
+    {"type": "Feature",
+     "properties": {"code_station": "A123", "layer": "Stations qualité eau"},
+     "geometry": {"type": "LineString", "coordinates": [[7.0, 48.0], [7.5, 48.5]]}},
+    {"type": "Feature", "properties": {"layer": "Piézomètres"}, "geometry": None},
+    {"type": "Feature", "id": 2, "properties": {"layer": "Piézomètres"},
+     "geometry": {"type": "Point", "coordinates": [4.0, 49.0]}},
+    {"type": "Feature", "id": 1, "properties": {"layer": "Doublon"},
+     "geometry": {"type": "Point", "coordinates": [5.0, 48.0]}},
+]
+
+
+@pytest.fixture
+def geojson_file(tmp_path):
+    path = tmp_path / "couches.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": FEATURES,
+                                "bbox": [4, 48, 8, 49]}, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+def test_random_access_matches_full_parse(geojson_file):
+    with GeoJsonReader(geojson_file) as reader:
+        assert len(reader) == len(FEATURES)
+        assert [reader[i] for i in range(len(reader))] == FEATURES
+
+
+def test_get_by_id_and_duplicates(geojson_file):
+    with GeoJsonReader(geojson_file) as reader:
+        assert reader.get(1) == FEATURES[0]
+        assert reader.get("A123") == FEATURES[1]
+        assert reader.get("absent") is None
+
+
+def test_positional_fallback_does_not_collide(geojson_file):
+    with GeoJsonReader(geojson_file) as reader:
+        # L'entité sans identifiant en position 2 ne masque pas l'"id": 2 de la position 3
+        assert reader.ids[2] == "#2"
+        assert reader.get("#2") == FEATURES[2]
+        assert reader.get(2) == FEATURES[3]
+
+
+def test_layer_and_bbox_filters(geojson_file):
+    with GeoJsonReader(geojson_file) as reader:
+        assert reader.layers() == {"Doublon": 1, "Piézomètres": 3, "Stations qualité eau": 1}
+        assert list(reader.features(layer="Piézomètres", bbox=(6.0, 48.5, 6.5, 49.0))) == [FEATURES[0]]
+        assert list(reader.positions(bbox=(7.2, 48.2, 7.3, 48.3))) == [1]
+        assert list(reader.positions(layer="Inconnue")) == []
+
+
+def test_index_reused_then_rebuilt_when_source_changes(geojson_file):
+    GeoJsonReader(geojson_file).close()
+    assert os.path.exists(geojson_file + INDEX_SUFFIX)
+
+    with open(geojson_file, "a", encoding="utf-8") as f:
+        f.write("\n")
+    os.utime(geojson_file, ns=(0, 0))
+    with GeoJsonReader(geojson_file) as reader:
+        assert int(reader.index["source_size"]) == os.path.getsize(geojson_file)
+
+
+def test_truncated_index_is_rebuilt(geojson_file, monkeypatch, capsys):
+    GeoJsonReader(geojson_file).close()
+    with open(geojson_file + INDEX_SUFFIX, "r+b") as f:
+        f.truncate(50)
+
+    with GeoJsonReader(geojson_file) as reader:
+        assert reader.get("A123") == FEATURES[1]
+    assert "illisible" in capsys.readouterr().out
+
+    # L'index reconstruit est valide : il est rechargé sans nouvelle reconstruction
+    def fail(path):
+        raise AssertionError("index reconstruit inutilement")
+
+    monkeypatch.setattr(geojson_reader, "build_index", fail)
+    with GeoJsonReader(geojson_file) as reader:
+        assert reader.get("A123") == FEATURES[1]
+    assert capsys.readouterr().out == ""
+
+
+def test_unwritable_index_stays_in_memory(geojson_file, monkeypatch):
+    def deny(*args, **kwargs):
+        raise PermissionError("read-only directory")
+
+    monkeypatch.setattr(geojson_reader.tempfile, "mkstemp", deny)
+    with GeoJsonReader(geojson_file) as reader:
+        assert reader.get(1) == FEATURES[0]
+    assert not os.path.exists(geojson_file + INDEX_SUFFIX)
+    assert [p for p in os.listdir(os.path.dirname(geojson_file)) if p.endswith(".tmp")] == []
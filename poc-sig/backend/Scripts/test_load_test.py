@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Tests du harnais de tests de charge (python -m pytest test_load_test.py)"""
+
+import asyncio
+import os
+import re
+import socket
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+from load_test import (
+    GRAND_EST_BBOX,
+    Stats,
+    percentile,
+    replay,
+    start_stand_in_server,
+    summarize,
+    synthesize_sessions,
+    tile_bboxes,
+    viewport_bbox,
+)
+
+CONTROLLERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Controllers")
+
+_CLASS_ROUTE = re.compile(r'\[Route\("([^"]*)"\)\]\s*public\s+class\s+(\w+)Controller')
+_GET_ACTION = re.compile(r'\[HttpGet(?:\("([^"]*)"\))?\]\s*public[^(]*\(([^)]*)\)', re.DOTALL)
+_QUERY_PARAM = re.compile(r'\[FromQuery\]\s*[\w?<>]+\s+(\w+)')
+
+
+def controller_get_routes():
+    """(regex du chemin, paramètres de requête acceptés) pour chaque action GET des contrôleurs"""
+    routes = []
+    for filename in os.listdir(CONTROLLERS_DIR):
+        with open(os.path.join(CONTROLLERS_DIR, filename), encoding="utf-8") as f:
+            source = f.read()
+        route = _CLASS_ROUTE.search(source)
+        if not route:
+            continue
+        prefix = route.group(1).replace("[controller]", route.group(2).lower())
+        for template, params in _GET_ACTION.findall(source):
+            path = "/" + "/".join(p for p in (prefix, template) if p)
+            pattern = re.sub(r"\\\{\w+\\\}", r"\\d+", re.escape(path))
+            routes.append((re.compile(f"^{pattern}$"), set(_QUERY_PARAM.findall(params))))
+    return routes
+
+
+def matching_route(routes, path):
+    url = urlsplit(path)
+    for pattern, params in routes:
+        if pattern.match(url.path):
+            return params, dict(parse_qsl(url.query))
+    return None, None
+
+
+def parse_bbox(value):
+    values = [float(v) for v in value.split(",")]
+    assert len(values) == 4
+    assert values[0] < values[2] and values[1] < values[3]
+    return values
+
+
+def test_sessions_are_deterministic_for_a_seed():
+    assert synthesize_sessions(5, [1, 2, 3], 20, seed=7) == synthesize_sessions(5, [1, 2, 3], 20, seed=7)
+    assert synthesize_sessions(5, [1, 2, 3], 20, seed=7) != synthesize_sessions(5, [1, 2, 3], 20, seed=8)
+
+
+def test_session_paths_match_controller_routes():
+    routes = controller_get_routes()
+    assert routes, "aucune route de contrôleur trouvée"
+
+    endpoints = set()
+    for session in synthesize_sessions(20, [1, 2, 3], 40, seed=1):
+        for endpoint, path in session:
+            endpoints.add(endpoint)
+            allowed, query = matching_route(routes, path)
+            assert allowed is not None, f"aucune route de contrôleur pour {path}"
+            assert set(query) <= allowed, f"paramètres inconnus dans {path}"
+            if "bbox" in query:
+                parse_bbox(query["bbox"])
+            if endpoint == "autocomplete":
+                assert len(query["q"]) >= 2
+                assert 1 <= int(query["maxResults"]) <= 50
+
+    assert endpoints == {"cluster", "features", "autocomplete", "export_geojson", "export_csv"}
+
+
+@pytest.mark.parametrize("zoom", [7, 10, 12, 14, 16])
+def test_tiles_cover_the_viewport_without_gaps(zoom):
+    center = ((GRAND_EST_BBOX[0] + GRAND_EST_BBOX[2]) / 2, (GRAND_EST_BBOX[1] + GRAND_EST_BBOX[3]) / 2)
+    viewport = viewport_bbox(*center, zoom)
+    tiles = tile_bboxes(viewport, zoom)
+
+    # Les tuiles forment un rectangle plein : bords consécutifs, sans trou
+    xs = sorted({t[0] for t in tiles} | {t[2] for t in tiles})
+    ys = sorted({t[1] for t in tiles} | {t[3] for t in tiles})
+    assert len(tiles) == (len(xs) - 1) * (len(ys) - 1)
+    for tile in tiles:
+        assert xs.index(tile[2]) == xs.index(tile[0]) + 1
+        assert ys.index(tile[3]) == ys.index(tile[1]) + 1
+
+    assert xs[0] <= viewport[0] and xs[-1] >= viewport[2]
+    assert ys[0] <= viewport[1] and ys[-1] >= viewport[3]
+
+
+def test_percentile_nearest_rank():
+    values = [15, 20, 35, 40, 50]
+    assert percentile(values, 5) == 15
+    assert percentile(values, 30) == 20
+    assert percentile(values, 40) == 20
+    assert percentile(values, 50) == 35
+    assert percentile(values, 100) == 50
+
+    ten = list(range(1, 11))
+    assert percentile(ten, 90) == 9
+    assert percentile(ten, 95) == 10
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize_error_rates_and_throughput():
+    stats = Stats()
+    stats.started, stats.finished = 10.0, 12.0
+    for latency, status in [(0.1, 200), (0.2, 200), (0.3, 500), (0.4, 404)]:
+        stats.record("cluster", latency, status, size=100)
+    stats.record_client_error("cluster")
+    stats.record("autocomplete", 0.05, 200)
+
+    summary = summarize(stats)
+    cluster = summary["endpoints"]["cluster"]
+    assert cluster["requests"] == 5
+    assert cluster["http_errors"] == 2
+    assert cluster["client_errors"] == 1
+    assert cluster["error_rate"] == pytest.approx(3 / 5)
+    assert cluster["http_error_rate"] == pytest.approx(2 / 5)
+    assert cluster["rps"] == pytest.approx(2.5)
+    assert cluster["p50_ms"] == pytest.approx(200)
+
+    assert "features" not in summary["endpoints"]
+    assert summary["requests"] == 6
+    assert summary["errors"] == 3
+    assert summary["error_rate"] == pytest.approx(0.5)
+    assert summary["rps"] == pytest.approx(3.0)
+    assert summary["bytes"] == 400
+
+
+def test_replay_counts_http_errors_from_stand_in():
+    server, base_url = start_stand_in_server()
+    session = [
+        ("cluster", "/api/cluster/1?zoom=8"),
+        ("features", "/api/stand-in-status/500"),
+        ("autocomplete", "/api/unknown-route"),
+        ("autocomplete", "/api/search/autocomplete?q=Me&maxResults=10"),
+        ("export_csv", "/api/export/1/csv"),
+    ]
+    try:
+        stats = asyncio.run(replay([session, session], base_url, concurrency=2, timeout=5))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert stats.http_errors == {"cluster": 0, "features": 2, "autocomplete": 2,
+                                 "export_geojson": 0, "export_csv": 0}
+    assert sum(stats.client_errors.values()) == 0
+    # Une connexion keep-alive par session, malgré les erreurs HTTP et la réponse chunked
+    assert stats.connects == 2
+    summary = summarize(stats)
+    assert summary["requests"] == 10
+    assert summary["error_rate"] == pytest.approx(0.4)
+
+
+def test_replay_reports_connection_failures_as_client_errors():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    stats = asyncio.run(replay([[("cluster", "/api/cluster/1")] * 3], f"http://127.0.0.1:{port}",
+                               concurrency=1, timeout=2))
+
+    assert stats.client_errors["cluster"] == 3
+    assert stats.http_errors["cluster"] == 0
+    assert stats.latencies["cluster"] == []
+    assert summarize(stats)["client_error_rate"] == 1.0
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Tests de la détection de CRS et de la reprojection (python -m pytest test_reprojection.py)"""
+
+import numpy as np
+import pytest
+
+from reprojection import LAMBERT_93, WGS84, crs_from_metadata, detect_crs, to_wgs84, wgs84_to_lcc
+
+# Enregistrement piézomètre Hub'Eau : la géométrie est déclarée en CRS84
+HUBEAU_PIEZOMETER = {
+    "code_bss": "01586X0064/F.E.D.",
+    "x": 4.093781595,
+    "y": 48.961999858,
+    "geometry": {
+        "type": "Point",
+        "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}},
+        "coordinates": [4.09378159505969, 48.9619998580307],
+    },
+}
+
+LONS = np.array([4.09, 6.18, 7.75, 5.14])
+LATS = np.array([48.96, 48.69, 48.58, 48.11])
+
+
+def test_paris_lambert_93_reference_point():
+    x, y = wgs84_to_lcc(2.3522, 48.8566, LAMBERT_93)
+    assert x == pytest.approx(652469.02, abs=0.01)
+    assert y == pytest.approx(6862035.26, abs=0.01)
+
+
+@pytest.mark.parametrize("crs", [LAMBERT_93, "EPSG:3948", "EPSG:3949"])
+def test_round_trip_and_range_detection(crs):
+    xs, ys = wgs84_to_lcc(LONS, LATS, crs)
+    lons, lats, detected = to_wgs84(xs, ys)
+    assert detected == crs
+    np.testing.assert_allclose(lons, LONS, atol=1e-9)
+    np.testing.assert_allclose(lats, LATS, atol=1e-9)
+
+
+def test_geometry_crs_is_ignored_for_flat_fields():
+    assert crs_from_metadata(HUBEAU_PIEZOMETER) is None
+    assert crs_from_metadata(HUBEAU_PIEZOMETER, geometry=True) == WGS84
+
+
+def test_declared_crs_contradicted_by_values_falls_back_to_ranges():
+    xs, ys = wgs84_to_lcc(LONS, LATS, LAMBERT_93)
+    record = dict(HUBEAU_PIEZOMETER, srid=4326)
+    assert detect_crs(xs, ys, metadata=record) == LAMBERT_93
+
+    lons, lats, crs = to_wgs84(xs, ys, metadata=record)
+    assert crs == LAMBERT_93
+    np.testing.assert_allclose(lats, LATS, atol=1e-9)
+
+
+def test_declared_crs_kept_when_consistent():
+    xs, ys = wgs84_to_lcc(LONS, LATS, "EPSG:3948")
+    assert detect_crs(xs, ys, metadata={"srid": 3948}) == "EPSG:3948"
+    assert detect_crs(LONS, LATS, metadata="EPSG:4326") == WGS84
+
+
+def test_sandre_code_projection():
+    assert crs_from_metadata({"code_projection": 26}) == LAMBERT_93
+    assert crs_from_metadata({"code_projection": "31"}) == WGS84
+    assert crs_from_metadata({"code_projection": "2154"}) is None
+
+
+def test_unrecognized_values_raise():
+    with pytest.raises(ValueError):
+        detect_crs([5e7], [5e7])
+
+
+def test_lambert_93_and_cc47_overlap_is_ambiguous():
+    # Ajaccio en Lambert-93 tombe aussi dans la plage de CC47 (Bretagne)
+    xs, ys = wgs84_to_lcc([8.74], [41.93], LAMBERT_93)
+    with pytest.raises(ValueError, match="ambiguës"):
+        detect_crs(xs, ys)
+    assert detect_crs(xs, ys, metadata={"srid": 2154}) == LAMBERT_93
+
+    # L'est du Grand Est en Lambert-93 (Strasbourg) reste sans ambiguïté
+    xs, ys = wgs84_to_lcc([7.75], [48.58], LAMBERT_93)
+    assert detect_crs(xs, ys) == LAMBERT_93
+
+
+def test_unknown_crs_stops_piezometer_fetch(monkeypatch):
+    pytest.importorskip("requests")
+    import create_grand_est_data
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"data": [{"code_bss": "X", "geometry_x": 5e7, "geometry_y": 5e7}]}
+
+    monkeypatch.setattr(create_grand_est_data.requests, "get", lambda *args, **kwargs: Response())
+    # Un CRS non reconnu interrompt la génération au lieu d'omettre silencieusement le département
+    with pytest.raises(ValueError, match="CRS non reconnu"):
+        create_grand_est_data.fetch_piezometers()
@@ -1,7 +1,11 @@
 import json
 import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "poc-sig", "backend", "Scripts"))
+from reprojection import to_wgs84
+
 def process_water_stations():
     """Process water quality stations data from Hub'Eau API"""
     features = []
@@ -87,9 +91,21 @@ def process_water_stations():
         with open(piezo_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
 
+        stations = [s for s in data.get('data', []) if s.get('x') and s.get('y')]
+
+        # Reproject all coordinates in one call, the source CRS comes from metadata or value ranges.
+        # An unrecognized or ambiguous CRS raises ValueError and stops the run on purpose
         piezo_count = 0
-        for station in data.get('data', []):
-            if station.get('x') and station.get('y'):
+        if stations:
+            lons, lats, crs = to_wgs84(
+                [float(s['x']) for s in stations],
+                [float(s['y']) for s in stations],
+                metadata=stations[0]
+            )
+            if crs != "EPSG:4326":
+                print(f"Reprojected piezometric stations from {crs} to WGS84")
+
+            for station, lon, lat in zip(stations, lons, lats):
                 feature = {
                     "type": "Feature",
                     "properties": {
@@ -110,10 +126,7 @@ def process_water_stations():
                     },
                     "geometry": {
                         "type": "Point",
-                        "coordinates": [
-                            float(station.get('x')),
-                            float(station.get('y'))
-                        ]
+                        "coordinates": [float(lon), float(lat)]
                     }
                 }
                 features.append(feature)